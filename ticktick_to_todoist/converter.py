@@ -3,11 +3,53 @@ Core conversion logic for transforming TickTick CSV exports to Todoist import fo
 With support for Todoist's 300 task per project limit and UTF-8 handling.
 """
 import csv
-import codecs
+import io
+from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict, Optional, TextIO
 from math import ceil
 
+from .utils import clean_label_name
+
+BUFFER_SIZE = 1 << 20  # 1MB reads and writes for large backups
+
+# Column indexes in TickTickToTodoistConverter.TICKTICK_HEADER
+IDX_FOLDER = 0
+IDX_LIST = 1
+IDX_TITLE = 2
+IDX_TAGS = 4
+IDX_CONTENT = 5
+IDX_DUE = 8
+IDX_PRIORITY = 11
+IDX_STATUS = 12
+IDX_TASKID = 22
+IDX_PARENT = 23
+
+# Fixed output format for Todoist imports, with plain '\n' line endings on every
+# platform. The BOM is written by the output file's utf-8-sig encoding.
+TODOIST_DIALECT = 'todoist'
+csv.register_dialect(
+    TODOIST_DIALECT,
+    delimiter=',',
+    quotechar='"',
+    quoting=csv.QUOTE_MINIMAL,
+    lineterminator='\n'
+)
+
+class _CleanTextTable(dict):
+    """Translation table for clean_text that deletes any character not explicitly kept."""
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        # Keep only printable ASCII characters, newlines and Nordic characters
+        char = chr(codepoint)
+        if (32 <= codepoint <= 126) or char == '\n' or char in 'æøåÆØÅ':
+            result = codepoint
+        else:
+            result = None
+        self[codepoint] = result
+        return result
+
+
 class TickTickToTodoistConverter:
     TICKTICK_HEADER = [
         'Folder Name', 'List Name', 'Title', 'Kind', 'Tags', 'Content', 
@@ -25,8 +67,30 @@ class TickTickToTodoistConverter:
     PRIORITY_MAP = {0: 4, 5: 3, 3: 2, 1: 1}  # TickTick to Todoist priority mapping
     TASKS_PER_PROJECT = 300  # Todoist's limit
 
+    # Replacements for problematic characters, everything else outside the
+    # kept character set is removed
+    _TRANSLATE_TABLE = _CleanTextTable(str.maketrans({
+        '\u201c': '"',    # Smart quotes
+        '\u201d': '"',
+        '\u2018': "'",    # Smart apostrophes
+        '\u2019': "'",
+        '–': '-',         # En dash
+        '—': '-',         # Em dash
+        '…': '...',       # Ellipsis
+        '\u200b': None,   # Zero-width space
+        '\u200c': None,   # Zero-width non-joiner
+        '\u200d': None,   # Zero-width joiner
+        '\ufeff': None,   # Byte order mark
+        '\r': '\n',       # Carriage returns
+        '\t': ' ',        # Tabs
+    }))
+
     def __init__(self, include_priority: bool = True):
         self.include_priority = include_priority
+        # Priority column value to Todoist priority, so tasks need no int/str round-trip
+        self._priority_str = {
+            str(ticktick): str(todoist) for ticktick, todoist in self.PRIORITY_MAP.items()
+        } if include_priority else {}
 
     def clean_text(self, text: str) -> str:
         """Aggressively clean text for Todoist compatibility."""
@@ -35,147 +99,91 @@ class TickTickToTodoistConverter:
             
         # Basic string normalization
         text = text.strip()
-        
-        # Replace problematic characters
-        replacements = {
-            '"': '"',        # Smart quotes
-            '"': '"',
-            ''': "'",        # Smart apostrophes
-            ''': "'",
-            '–': '-',        # En dash
-            '—': '-',        # Em dash
-            '…': '...',      # Ellipsis
-            '\u200b': '',    # Zero-width space
-            '\u200c': '',    # Zero-width non-joiner
-            '\u200d': '',    # Zero-width joiner
-            '\ufeff': '',    # Byte order mark
-            '\r': '\n',      # Carriage returns
-            '\t': ' ',       # Tabs
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        # Remove emojis and other special characters
-        cleaned = ''
-        for char in text:
-            # Keep only printable ASCII characters, newlines, and basic punctuation
-            if (32 <= ord(char) <= 126) or char == '\n' or char in 'æøåÆØÅ':
-                cleaned += char
-                
+
+        # Replace problematic characters and drop emojis and other special
+        # characters in a single pass, unless the text is plain printable ASCII
+        if not (text.isascii() and text.isprintable()):
+            text = text.translate(self._TRANSLATE_TABLE)
+
         # Normalize whitespace
-        cleaned = ' '.join(cleaned.split())
-        
-        return cleaned
+        return ' '.join(text.split())
 
     def clean_label_name(self, name: str) -> str:
         """Convert a string into a valid Todoist label."""
-        if not name:
-            return ""
-            
-        # Replace spaces and dashes with underscore
-        cleaned = name.replace(' ', '_').replace('-', '_')
-        
-        # Keep only alphanumeric, underscore and Nordic characters
-        cleaned = ''.join(c for c in cleaned if c.isalnum() or c == '_' or c in 'æøåÆØÅ')
-        
-        # Ensure no double underscores
-        while '__' in cleaned:
-            cleaned = cleaned.replace('__', '_')
-            
-        # Remove any leading or trailing underscores
-        cleaned = cleaned.strip('_')
-        
-        return cleaned.lower()
+        return clean_label_name(name)
+
+    def _read_rows(self, file_path: Path, encoding: str) -> List[List[str]]:
+        """Read the task rows of a TickTick CSV file using the given encoding."""
+        with open(file_path, 'rb', buffering=BUFFER_SIZE) as raw:
+            f = io.TextIOWrapper(raw, encoding=encoding, newline='')
+
+            # Skip metadata lines
+            for _ in range(6):
+                f.readline()
+
+            reader = csv.reader(f)
+            header = next(reader)
+
+            if header != self.TICKTICK_HEADER:
+                raise ValueError("Invalid CSV file: Header doesn't match TickTick format")
+
+            return list(reader)
 
     def read_ticktick_csv(self, file_path: Path) -> List[List[str]]:
         """Read and validate TickTick CSV file with proper UTF-8 handling."""
         try:
             # Use UTF-8-SIG to handle BOM if present
-            with codecs.open(file_path, 'r', encoding='utf-8-sig') as f:
-                # Skip metadata lines
-                for _ in range(6):
-                    next(f)
-                
-                reader = csv.reader(f)
-                header = next(reader)
-                
-                if header != self.TICKTICK_HEADER:
-                    raise ValueError("Invalid CSV file: Header doesn't match TickTick format")
-                
-                return list(reader)
+            return self._read_rows(file_path, 'utf-8-sig')
         except UnicodeDecodeError:
             # Try with alternative encodings if UTF-8 fails
             try:
-                with codecs.open(file_path, 'r', encoding='iso-8859-1') as f:
-                    for _ in range(6):
-                        next(f)
-                    reader = csv.reader(f)
-                    header = next(reader)
-                    if header != self.TICKTICK_HEADER:
-                        raise ValueError("Invalid CSV file: Header doesn't match TickTick format")
-                    return list(reader)
+                return self._read_rows(file_path, 'iso-8859-1')
             except Exception as e:
                 raise ValueError(f"Could not read file with UTF-8 or ISO-8859-1 encoding: {str(e)}")
 
     def calculate_indents(self, tasks: List[List[str]]) -> Dict[str, int]:
         """Calculate indent levels for tasks based on parent-child relationships."""
         root_tasks = []
-        child_tasks = {}
+        child_tasks = defaultdict(list)
         indents = {}
         
         # Separate root tasks and build child task relationships
         for task in tasks:
-            task_id = task[22]
-            parent_id = task[23]
+            task_id = task[IDX_TASKID]
+            parent_id = task[IDX_PARENT]
             
             if not parent_id:
                 root_tasks.append(task_id)
             else:
-                if parent_id not in child_tasks:
-                    child_tasks[parent_id] = []
                 child_tasks[parent_id].append(task_id)
         
-        # Recursively set indent levels
-        def set_indent_level(task_id: str, level: int):
-            indents[task_id] = min(level, 4)  # Todoist only supports 4 levels of indentation
+        # Walk the hierarchy depth-first, pushing siblings in reverse so tasks
+        # are visited in their original order
+        stack = [(task_id, 1) for task_id in reversed(root_tasks)]
+        while stack:
+            task_id, level = stack.pop()
+            indents[task_id] = level
             if task_id in child_tasks:
-                for child_id in child_tasks[task_id]:
-                    set_indent_level(child_id, level + 1)
-        
-        # Process all root tasks
-        for task_id in root_tasks:
-            set_indent_level(task_id, 1)
+                # Todoist only supports 4 levels of indentation
+                child_level = level + 1 if level < 4 else 4
+                stack.extend((child_id, child_level) for child_id in reversed(child_tasks[task_id]))
         
         return indents
 
-    def validate_csv_row(self, row: List[str]) -> bool:
-        """Check if a CSV row contains any problematic characters."""
-        try:
-            # Try writing the row to a string buffer
-            output = []
-            writer = csv.writer(output)
-            writer.writerow(row)
-            # Convert back to check if it's valid
-            reader = csv.reader(output)
-            list(reader)
-            return True
-        except Exception:
-            return False
-
-    def create_todoist_task(self, task: List[str], indent: int) -> List[str]:
-        """Convert a single TickTick task to Todoist format."""
-        title = self.clean_text(task[2])
-        content = self.clean_text(task[5])
+    def create_todoist_task(self, task: List[str], indent: int, cleaned_desc: Optional[str] = None) -> List[str]:
+        """Convert a single TickTick task to Todoist format, reusing cleaned_desc if given."""
+        folder_name, list_name, title_raw, tags_raw, content_raw = (
+            task[IDX_FOLDER], task[IDX_LIST], task[IDX_TITLE], task[IDX_TAGS], task[IDX_CONTENT]
+        )
+        title = self.clean_text(title_raw)
+        content = self.clean_text(content_raw) if cleaned_desc is None else cleaned_desc
         
         # Skip if title is empty after cleaning
         if not title:
             return []
 
-        list_name = task[1]
-        folder_name = task[0]
-        status = task[12]
-        due_date = task[8]
+        status = task[IDX_STATUS]
+        due_date = task[IDX_DUE]
         
         # Collect labels
         labels = []
@@ -191,16 +199,14 @@ class TickTickToTodoistConverter:
             labels.append('completed')
         
         # Add original tags
-        if task[4]:  # Tags column
-            labels.extend(self.clean_label_name(tag.strip()) for tag in task[4].split(','))
+        if tags_raw:
+            labels.extend(self.clean_label_name(tag.strip()) for tag in tags_raw.split(','))
         
         # Build task content with labels
-        task_content = title
-        if labels:
-            task_content += ' ' + ' '.join(f'@{label}' for label in labels)
+        task_content = title + ' @' + ' @'.join(labels) if labels else title
         
         # Set priority
-        priority = str(self.PRIORITY_MAP.get(int(task[11]), 4)) if self.include_priority else '4'
+        priority = self._priority_str.get(task[IDX_PRIORITY], '4')
         
         return [
             'task',          # TYPE
@@ -216,10 +222,15 @@ class TickTickToTodoistConverter:
             '',            # DURATION
             'None'         # DURATION_UNIT
         ]
-    def create_note_row(self, content: str) -> List[str]:
+    def create_note_row(self, content: str, already_clean: bool = False) -> List[str]:
         """Create a note row for task description."""
-        cleaned_content = self.clean_text(content)
-        row = [
+        cleaned_content = content if already_clean else self.clean_text(content)
+
+        # Skip if content is empty after cleaning
+        if not cleaned_content:
+            return []
+
+        return [
             'note',          # TYPE
             cleaned_content, # CONTENT
             '',             # DESCRIPTION
@@ -234,25 +245,17 @@ class TickTickToTodoistConverter:
             'None'          # DURATION_UNIT
         ]
 
-        # Validate the row, if invalid return empty note
-        if not self.validate_csv_row(row):
-            print(f"Warning: Had to remove note due to incompatible characters")
-            return None
-        return row
-
     def process_chunk(self, tasks: List[List[str]], chunk_number: int, total_chunks: int) -> List[List[str]]:
-        """Process a chunk of tasks and add chunk information to labels."""
-        processed_tasks = []
+        """Process a chunk of tasks and add chunk information to labels, updating the tasks in place."""
+        if total_chunks <= 1:
+            return tasks
+
+        part_tag = f"part_{chunk_number}_of_{total_chunks}"
         for task in tasks:
-            task = list(task)  # Create a copy of the task
-            # Add chunk information to the content
-            if total_chunks > 1:
-                if task[4]:  # If there are existing tags
-                    task[4] = f"{task[4]},part_{chunk_number}_of_{total_chunks}"
-                else:
-                    task[4] = f"part_{chunk_number}_of_{total_chunks}"
-            processed_tasks.append(task)
-        return processed_tasks
+            # Add chunk information to the tags
+            tags = task[IDX_TAGS]
+            task[IDX_TAGS] = f"{tags},{part_tag}" if tags else part_tag
+        return tasks
 
     def split_tasks_into_chunks(self, tasks: List[List[str]]) -> List[List[List[str]]]:
         """Split tasks into chunks of TASKS_PER_PROJECT."""
@@ -288,8 +291,8 @@ class TickTickToTodoistConverter:
         indents = self.calculate_indents(tasks)
         
         # Sort tasks based on hierarchy
-        task_ids = list(indents.keys())
-        tasks.sort(key=lambda x: task_ids.index(x[22]))
+        order = {task_id: i for i, task_id in enumerate(indents)}
+        tasks.sort(key=lambda x: order[x[IDX_TASKID]])
         
         # Split into chunks if necessary
         chunks = self.split_tasks_into_chunks(tasks)
@@ -300,29 +303,31 @@ class TickTickToTodoistConverter:
             suffix = f"_part{i+1}" if len(chunks) > 1 else ""
             output_file = output_dir / f"todoist_import{suffix}.csv"
             
-            # Convert chunk to Todoist format
-            todoist_tasks = [self.TODOIST_HEADER]
-            
-            for task in chunk:
-                # Add main task
-                todoist_task = self.create_todoist_task(task, indents[task[22]])
-                if todoist_task:
-                    todoist_tasks.append(todoist_task)
-                
-                # Add note if task has description
-                if task[5]:
-                    note_row = self.create_note_row(task[5])
-                    if note_row:  # Only add if valid
-                        todoist_tasks.append(note_row)
-            
-            # Write output file
-            with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerows(todoist_tasks)
-            
+            # Convert chunk to Todoist format and write it out as we go
+            raw = open(output_file, 'wb', buffering=BUFFER_SIZE)
+            with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, dialect=TODOIST_DIALECT)
+                writer.writerow(self.TODOIST_HEADER)
+                task_count = 0
+
+                for task in chunk:
+                    # Description is used for both the task and its note
+                    cleaned_desc = self.clean_text(task[IDX_CONTENT])
+
+                    # Add main task
+                    todoist_task = self.create_todoist_task(task, indents[task[IDX_TASKID]], cleaned_desc=cleaned_desc)
+                    if todoist_task:
+                        writer.writerow(todoist_task)
+                        task_count += 1
+
+                    # Add note if task has description
+                    if cleaned_desc:
+                        note_row = self.create_note_row(cleaned_desc, already_clean=True)
+                        if note_row:  # Only add if not empty
+                            writer.writerow(note_row)
+
             output_files.append(output_file)
-            
-            task_count = len([t for t in todoist_tasks if t[0] == 'task'])
+
             print(f"Created {output_file} with {task_count} tasks")
-        
+
         return output_files
\ No newline at end of file
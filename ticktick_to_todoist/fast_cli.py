@@ -0,0 +1,42 @@
+"""
+Minimal command-line interface for scripted use of the TickTick to Todoist converter.
+Uses only the standard library, so it starts without importing click or rich.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from .converter import TickTickToTodoistConverter
+from .utils import ensure_path
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Convert TickTick backup CSV to Todoist import format."""
+    parser = argparse.ArgumentParser(
+        prog='ticktick-to-todoist-fast',
+        description='Convert TickTick backup CSV to Todoist import format.'
+    )
+    parser.add_argument('input_file')
+    parser.add_argument('-o', '--output', help='Output file (default: todoist_import.csv)')
+    parser.add_argument('--no-priority', action='store_true', help='Disable priority mapping')
+    args = parser.parse_args(argv)
+
+    try:
+        input_path = ensure_path(args.input_file)
+        output_path = Path(args.output) if args.output else None
+
+        # Initialize converter
+        converter = TickTickToTodoistConverter(include_priority=not args.no_priority)
+
+        # Convert file
+        output_file = converter.convert(input_path, output_path)
+
+        print(f"\nCreated {output_file}")
+        print(f"Priority mapping is {'disabled' if args.no_priority else 'enabled'}")
+
+    except Exception as e:
+        print(f"\nError: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
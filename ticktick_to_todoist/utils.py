@@ -2,22 +2,42 @@
 Utility functions for the TickTick to Todoist converter.
 """
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
 
+# Runs of underscores and anything but letters and digits (Nordic letters
+# are word characters too)
+_LABEL_SEPARATORS = re.compile(r'[\W_]+')
+
+@lru_cache(maxsize=4096)
 def clean_label_name(name: str) -> str:
     """
     Convert a string into a valid Todoist label by removing spaces and special characters.
     
+    Runs of spaces, dashes and other special characters become a single underscore
+    and leading or trailing underscores are removed. Results are cached since the
+    same list, folder and tag names repeat across a whole backup.
+    
     Args:
         name: The original string to convert
         
     Returns:
         A cleaned string suitable for use as a Todoist label
     """
-    # Replace spaces with underscores and remove special characters
-    cleaned = re.sub(r'[^\w\s-]', '', name)
-    cleaned = cleaned.replace(' ', '_')
+    if not name:
+        return ""
+
+    # Plain ASCII words need no cleaning beyond lowercasing
+    if name.isascii() and name.isalnum():
+        return name.lower()
+
+    # Replace spaces, dashes and other special characters with a single underscore
+    cleaned = _LABEL_SEPARATORS.sub('_', name)
+
+    # Remove any leading or trailing underscores
+    cleaned = cleaned.strip('_')
+
     return cleaned.lower()
 
 def ensure_path(path: Union[str, Path]) -> Path: